@@ -4,6 +4,9 @@ import sys
 import subprocess
 import argparse
 import copy
+import stat
+import re
+from importlib.metadata import distributions
 
 # Check if running as root
 if os.geteuid() == 0:
@@ -17,15 +20,19 @@ if sys.prefix == sys.base_prefix:
     print("If you haven't set up a virtual environment, you can do so with these commands:")
     print("python3 -m venv ghost-static-env")
     print("source ghost-static-env/bin/activate")
-    print("pip install pillow-avif-plugin requests beautifulsoup4 pillow gitpython")
+    print("pip install pillow-avif-plugin aiohttp beautifulsoup4 lxml pillow gitpython")
     sys.exit(1)
 
 # Check if required packages are installed
-required_packages = ['pillow-avif-plugin', 'requests', 'beautifulsoup4', 'pillow', 'gitpython']
-installed_packages = subprocess.check_output([sys.executable, '-m', 'pip', 'freeze']).decode().split('\n')
-installed_packages = [package.split('==')[0].lower() for package in installed_packages]
+required_packages = ['pillow-avif-plugin', 'aiohttp', 'beautifulsoup4', 'lxml', 'pillow', 'gitpython']
+
+# Compare normalized distribution names (PEP 503) so pillow_avif_plugin matches pillow-avif-plugin
+def normalize_package_name(name):
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+installed_packages = {normalize_package_name(dist.metadata['Name']) for dist in distributions() if dist.metadata['Name']}
 
-missing_packages = [package for package in required_packages if package.lower() not in installed_packages]
+missing_packages = [package for package in required_packages if normalize_package_name(package) not in installed_packages]
 
 if missing_packages:
     print("The following required packages are missing:")
@@ -35,15 +42,19 @@ if missing_packages:
     print(f"pip install {' '.join(missing_packages)}")
     sys.exit(1)
 
+import html
 import urllib.request
 import urllib.parse
-from bs4 import BeautifulSoup
-import re
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree, html as lxml_html
 import shutil
 import git
 from PIL import Image
+import pillow_avif  # Registers the AVIF plugin with Pillow
 import concurrent.futures
-import requests
+import asyncio
+import aiohttp
+import itertools
 from urllib.parse import urljoin, urlparse
 import time
 import mimetypes
@@ -53,15 +64,71 @@ import shutil
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Patterns used on every scraped page, compiled once
+_URL_IN_CSS = re.compile(r"url\(['\"]?([^'\"]+)['\"]?\)")
+_RESOURCE_RE = re.compile(r'(["\'`])((?:\.{1,2}\/)*(?:[\w-]+\/)*[\w-]+\.(?:jpg|jpeg|png|gif|svg|js|css))\1')
+_EXT_RE = re.compile(r'\.[^.]+$')
+# One srcset candidate: the URL and its optional width/density descriptor
+_SRCSET_URL_RE = re.compile(r'([^\s,]+)(\s+[^\s,]+)?')
+# A style attribute (double-quoted, single-quoted or unquoted) inside a start tag, matched on raw page bytes
+_STYLE_ATTR_RE = re.compile(rb'''<[a-z][^\s/>]*\s(?:[^>]*?\s)?style\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''', re.IGNORECASE)
+# Script bodies and comments, whose tag-like text must not be mistaken for markup
+_NON_MARKUP_RE = re.compile(rb'<!--.*?-->|<script\b.*?</script\s*>', re.IGNORECASE | re.DOTALL)
+
+# The crawl only looks at these tags, so the parser skips building the rest of the tree
+_ASSET_STRAINER = SoupStrainer(['a', 'link', 'script', 'img', 'source', 'iframe', 'style', 'meta'])
+
+# Connection failures are retried this many times, backing off from _FETCH_BACKOFF seconds
+_FETCH_RETRIES = 3
+_FETCH_BACKOFF = 0.2
+
+# Non-HTML downloads are streamed to disk in chunks of this size
+_STREAM_CHUNK_SIZE = 1 << 20
+
+# Files at least this large are copied with os.sendfile instead of shutil.copy2
+_SENDFILE_MIN_SIZE = 128 * 1024
+
+def _fast_copy(src, dst, src_stat):
+    # Copy in kernel space with sendfile, then carry over mode and timestamps like copy2
+    if src_stat.st_size < _SENDFILE_MIN_SIZE or not hasattr(os, 'sendfile'):
+        shutil.copy2(src, dst)
+        return
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            offset = 0
+            while offset < src_stat.st_size:
+                sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, src_stat.st_size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+    except OSError:
+        # Some platforms only sendfile to sockets
+        shutil.copy2(src, dst)
+        return
+    os.chmod(dst, stat.S_IMODE(src_stat.st_mode))
+    os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+
 class ImprovedGhostStaticGenerator:
-    def __init__(self, source_url, target_url, repo_path, force_reconvert=False):
+    def __init__(self, source_url, target_url, repo_path, force_reconvert=False, max_concurrency=50):
         self.source_url = source_url
         self.target_url = target_url
         self.repo_path = repo_path
         self.public_dir = os.path.join(repo_path, 'public')
+        self._source_netloc = urlparse(source_url).netloc
+        self._target_netloc = urlparse(target_url).netloc
         self.visited_urls = set()
         self.file_urls = set()
         self.force_reconvert = force_reconvert
+        # Local file existence seen by the HTML pass, which never creates the files it checks
+        self._exists_cache = {}
+        self.max_concurrency = max_concurrency
+
+        # Created by scrape_site inside the running event loop
+        self.session = None
+        self.fetch_semaphore = None
+        self.pending_scrapes = []
+        # Distinct temp-file suffixes for downloads that share a target path (e.g. ?v= variants)
+        self._part_ids = itertools.count()
 
     def update_repo(self):
         try:
@@ -84,9 +151,41 @@ class ImprovedGhostStaticGenerator:
             print(f"An error occurred while updating the repository: {e}")
             print("Continuing with the rest of the script...")
 
-    def scrape_site(self):
-        self.scrape_url(self.source_url)
-        self.scrape_root_files()
+    async def scrape_site(self):
+        # One keep-alive connection pool shared by every fetch on a single event loop
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=30)
+        # Per-read rather than total timeouts, so large streamed downloads can finish
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+        headers = {'User-Agent': 'ImprovedGhostStaticGenerator/1.0'}
+        self.fetch_semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            self.session = session
+            self.enqueue_url(self.source_url)
+            self.scrape_root_files()
+
+            # Breadth-first crawl: each round gathers the scrapes queued by the one before
+            while self.pending_scrapes:
+                scrapes, self.pending_scrapes = self.pending_scrapes, []
+                await asyncio.gather(*scrapes)
+        self.session = None
+
+    def enqueue_url(self, url):
+        if url in self.visited_urls:
+            return
+        self.visited_urls.add(url)
+        self.pending_scrapes.append(asyncio.create_task(self.scrape_url(url)))
+
+    async def get(self, url):
+        # Callers hold fetch_semaphore and release the returned response
+        for attempt in range(_FETCH_RETRIES + 1):
+            try:
+                response = await self.session.get(url)
+                response.raise_for_status()
+                return response
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == _FETCH_RETRIES:
+                    raise
+                await asyncio.sleep(_FETCH_BACKOFF * 2 ** attempt)
     
     def scrape_root_files(self):
         root_files = [
@@ -100,72 +199,48 @@ class ImprovedGhostStaticGenerator:
         ]
         for file in root_files:
             url = urljoin(self.source_url, file)
-            self.scrape_url(url)
+            self.enqueue_url(url)
 
-    def scrape_url(self, url):
-        if url in self.visited_urls:
-            return
-        self.visited_urls.add(url)
-    
+    async def scrape_url(self, url):
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-    
-            content_type = response.headers.get('content-type', '').lower()
-            if 'text/html' in content_type:
-                self.process_html(url, response.text)
-                self.scrape_image_sizes(url)
-                self.scrape_meta_images(url)  # Add this line
-            elif 'image' in content_type:
-                self.file_urls.add(url)
-                self.save_file(url, response.content, os.path.splitext(urlparse(url).path)[1], is_binary=True)
-            elif any(type in content_type for type in ['text/css', 'javascript', 'application']):
-                self.file_urls.add(url)
-                self.save_file(url, response.content, os.path.splitext(urlparse(url).path)[1], is_binary=True)
-            else:
-                logging.info(f"Saving file with content-type {content_type}: {url}")
-                self.save_file(url, response.content, os.path.splitext(urlparse(url).path)[1], is_binary=True)
-    
-        except requests.exceptions.RequestException as e:
+            async with self.fetch_semaphore:
+                response = await self.get(url)
+                async with response:
+                    content_type = response.headers.get('content-type', '').lower()
+                    if 'text/html' in content_type:
+                        content = await response.read()
+                    else:
+                        if 'image' in content_type:
+                            self.file_urls.add(url)
+                        elif any(type in content_type for type in ['text/css', 'javascript', 'application']):
+                            self.file_urls.add(url)
+                        else:
+                            logging.info(f"Saving file with content-type {content_type}: {url}")
+                        # Stream assets straight to disk instead of holding whole bodies in memory
+                        await self._write_stream(self._target_path(url), response)
+                        return
+    
+            # Keep the page as raw bytes; lxml parses them directly and they are saved unchanged
+            soup = BeautifulSoup(content, 'lxml', parse_only=_ASSET_STRAINER)
+            await self.process_html(url, content, soup)
+            self.scrape_image_sizes(url, soup)
+            self.scrape_meta_images(url, soup)
+    
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logging.error(f"Error fetching {url}: {e}")
         except Exception as e:
             logging.error(f"Unexpected error scraping {url}: {str(e)}")
-    
-        time.sleep(0.1)
         
-    def scrape_meta_images(self, url):
-        try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error fetching URL {url}: {e}")
-            return
-    
+    def scrape_meta_images(self, url, soup):
         meta_images = soup.find_all('meta', property=['og:image', 'twitter:image'])
         for meta in meta_images:
             img_url = meta.get('content')
-            if img_url and self.is_same_domain(img_url):
-                try:
-                    img_response = requests.get(img_url, timeout=30)
-                    if img_response.status_code == 200:
-                        self.file_urls.add(img_url)
-                        self.save_file(img_url, img_response.content, os.path.splitext(img_url)[1], is_binary=True)
-                        logging.info(f"Scraped meta image: {img_url}")
-                    else:
-                        logging.warning(f"Failed to scrape meta image {img_url}: HTTP {img_response.status_code}")
-                except requests.exceptions.RequestException as e:
-                    logging.warning(f"Failed to scrape meta image {img_url}: {e}")
+            if img_url:
+                full_url = urljoin(url, img_url)
+                if self.is_same_domain(full_url):
+                    self.enqueue_url(full_url)
 
-    def scrape_image_sizes(self, url):
-        try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error fetching URL {url}: {e}")
-            return
-    
+    def scrape_image_sizes(self, url, soup):
         for img in soup.find_all(['img', 'source']):
             srcset = img.get('srcset') or img.get('data-srcset', '')
             src = img.get('src') or img.get('data-src', '')
@@ -174,78 +249,54 @@ class ImprovedGhostStaticGenerator:
             all_urls.extend([s.split()[0] for s in srcset.split(',') if s.strip()])
             
             for img_url in all_urls:
-                if img_url and self.is_same_domain(img_url):
-                    try:
-                        img_response = requests.get(img_url, timeout=30)
-                        if img_response.status_code == 200:
-                            self.file_urls.add(img_url)
-                            self.save_file(img_url, img_response.content, os.path.splitext(img_url)[1], is_binary=True)
-                            logging.info(f"Scraped image: {img_url}")
-                        else:
-                            logging.warning(f"Failed to scrape image {img_url}: HTTP {img_response.status_code}")
-                    except requests.exceptions.RequestException as e:
-                        logging.warning(f"Failed to scrape image {img_url}: {e}")
-    
-        # Also check for background images in inline styles
-        for tag in soup.find_all(style=True):
-            style = tag['style']
-            urls = re.findall(r'url\([\'"]?([^\'"]+)[\'"]?\)', style)
-            for img_url in urls:
-                if self.is_same_domain(img_url):
-                    try:
-                        img_response = requests.get(img_url, timeout=30)
-                        if img_response.status_code == 200:
-                            self.file_urls.add(img_url)
-                            self.save_file(img_url, img_response.content, os.path.splitext(img_url)[1], is_binary=True)
-                            logging.info(f"Scraped background image: {img_url}")
-                        else:
-                            logging.warning(f"Failed to scrape background image {img_url}: HTTP {img_response.status_code}")
-                    except requests.exceptions.RequestException as e:
-                        logging.warning(f"Failed to scrape background image {img_url}: {e}")
+                full_url = urljoin(url, img_url)
+                if self.is_same_domain(full_url):
+                    self.enqueue_url(full_url)
 
-    def scrape_iframe_content(self, iframe_src):
+    async def scrape_iframe_content(self, iframe_src):
         if not self.is_same_domain(iframe_src):
             return
     
         try:
-            response = requests.get(iframe_src, timeout=30)
-            response.raise_for_status()
-            iframe_content = response.text
+            async with self.fetch_semaphore:
+                response = await self.get(iframe_src)
+                async with response:
+                    content = await response.read()
+            iframe_content = content.decode('utf-8', errors='replace')
     
             # Save the iframe HTML file
-            self.save_file(iframe_src, iframe_content, '.html')
+            self.save_file(iframe_src, content, '.html', is_binary=True)
     
             # Parse the iframe content
-            iframe_soup = BeautifulSoup(iframe_content, 'html.parser')
+            iframe_soup = BeautifulSoup(content, 'lxml', parse_only=_ASSET_STRAINER)
     
             # Find and scrape all script files
             for script in iframe_soup.find_all('script', src=True):
                 script_src = urljoin(iframe_src, script['src'])
                 if self.is_same_domain(script_src):
-                    self.scrape_url(script_src)
+                    self.enqueue_url(script_src)
     
             # Find and scrape all CSS files
             for link in iframe_soup.find_all('link', rel='stylesheet'):
                 css_src = urljoin(iframe_src, link['href'])
                 if self.is_same_domain(css_src):
-                    self.scrape_url(css_src)
+                    self.enqueue_url(css_src)
     
             # Find and scrape all images
             for img in iframe_soup.find_all('img', src=True):
                 img_src = urljoin(iframe_src, img['src'])
                 if self.is_same_domain(img_src):
-                    self.scrape_url(img_src)
+                    self.enqueue_url(img_src)
     
             # Look for any other resources that might be loaded dynamically
             # This is a simple regex search and might need to be adjusted based on your specific JS code
-            resource_pattern = re.compile(r'(["\'`])((?:\.{1,2}\/)*(?:[\w-]+\/)*[\w-]+\.(?:jpg|jpeg|png|gif|svg|js|css))\1')
-            for match in resource_pattern.finditer(iframe_content):
+            for match in _RESOURCE_RE.finditer(iframe_content):
                 resource_path = match.group(2)
                 resource_url = urljoin(iframe_src, resource_path)
                 if self.is_same_domain(resource_url):
-                    self.scrape_url(resource_url)
+                    self.enqueue_url(resource_url)
     
-        except requests.exceptions.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logging.error(f"Error fetching iframe content from {iframe_src}: {e}")
     
     def copy_renders_folder(self):
@@ -259,37 +310,49 @@ class ImprovedGhostStaticGenerator:
         files_copied = 0
         files_skipped = 0
         
-        try:
-            # Walk through source directory
-            for root, dirs, files in os.walk(source_renders_path):
-                # Get the relative path from source
-                rel_path = os.path.relpath(root, source_renders_path)
-                dest_dir = os.path.join(destination_renders_path, rel_path)
-                
-                # Create destination directory if it doesn't exist
-                os.makedirs(dest_dir, exist_ok=True)
-                
-                # Copy each file if it doesn't exist or is newer
-                for file in files:
-                    source_file = os.path.join(root, file)
-                    dest_file = os.path.join(dest_dir, file)
-                    
-                    # Check if we need to copy
-                    should_copy = False
-                    if not os.path.exists(dest_file):
+        to_copy = []
+
+        def collect_dir(source_dir, dest_dir):
+            nonlocal files_skipped
+            # Create destination directories up front, before any copy workers start
+            os.makedirs(dest_dir, exist_ok=True)
+
+            with os.scandir(source_dir) as entries:
+                for entry in entries:
+                    dest_file = os.path.join(dest_dir, entry.name)
+                    if entry.is_dir():
+                        # Like os.walk, don't descend into symlinked directories
+                        if not entry.is_symlink():
+                            collect_dir(entry.path, dest_file)
+                        continue
+
+                    # Copy if the destination is missing or older; the source stat is cached on the entry
+                    try:
+                        should_copy = entry.stat().st_mtime > os.stat(dest_file).st_mtime
+                    except FileNotFoundError:
                         should_copy = True
-                    else:
-                        source_mtime = os.path.getmtime(source_file)
-                        dest_mtime = os.path.getmtime(dest_file)
-                        if source_mtime > dest_mtime:
-                            should_copy = True
-                    
+
                     if should_copy:
-                        shutil.copy2(source_file, dest_file)
-                        files_copied += 1
-                        logging.info(f"Copied render file: {dest_file}")
+                        to_copy.append((entry.path, dest_file, entry.stat()))
                     else:
                         files_skipped += 1
+
+        def copy_file(paths):
+            source_file, dest_file, source_stat = paths
+            _fast_copy(source_file, dest_file, source_stat)
+            logging.info(f"Copied render file: {dest_file}")
+
+        try:
+            # Like os.walk, a missing source tree just means there is nothing to copy
+            if os.path.isdir(source_renders_path):
+                collect_dir(source_renders_path, destination_renders_path)
+            else:
+                logging.info(f"Renders source folder not found, skipping: {source_renders_path}")
+
+            # Copies are disk-bound, so let the kernel overlap them
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(copy_file, to_copy))
+            files_copied = len(to_copy)
             
             logging.info(f"Renders folder sync complete: {files_copied} files copied, {files_skipped} unchanged files")
             
@@ -297,54 +360,73 @@ class ImprovedGhostStaticGenerator:
             logging.error(f"Error copying renders folder: {str(e)}")
 
     
-    def process_html(self, url, html_content):
-        self.save_file(url, html_content, '.html')
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        for tag in soup.find_all(['a', 'link', 'script', 'img', 'source']):
-            attr = tag.get('href') or tag.get('src') or tag.get('data-src')
-            if attr:
-                new_url = urljoin(url, attr)
-                if self.is_same_domain(new_url):
-                    self.scrape_url(new_url)
-    
-        # Process iframes
-        for iframe in soup.find_all('iframe'):
-            iframe_src = iframe.get('src')
-            if iframe_src:
-                iframe_url = urljoin(url, iframe_src)
-                if self.is_same_domain(iframe_url):
-                    self.scrape_iframe_content(iframe_url)
-                    # Update iframe src to use the target URL
-                    iframe['src'] = self.update_url(iframe_url)
-    
-        # Process inline CSS and extract image URLs
-        for style in soup.find_all('style'):
-            css_content = style.string
-            if css_content:
-                image_urls = re.findall(r'url\([\'"]?([^\'"]+)[\'"]?\)', css_content)
+    async def process_html(self, url, html_content, soup):
+        # soup only holds the asset tags; html_content is the full page
+        mutated = False
+        try:
+            for tag in soup.find_all(['a', 'link', 'script', 'img', 'source']):
+                attr = tag.get('href') or tag.get('src') or tag.get('data-src')
+                if attr:
+                    new_url = urljoin(url, attr)
+                    if self.is_same_domain(new_url):
+                        self.enqueue_url(new_url)
+    
+            # Process iframes
+            iframes = soup.find_all('iframe')
+            for iframe in iframes:
+                iframe_src = iframe.get('src')
+                if iframe_src:
+                    iframe_url = urljoin(url, iframe_src)
+                    if self.is_same_domain(iframe_url):
+                        await self.scrape_iframe_content(iframe_url)
+    
+            # Process inline CSS and extract image URLs
+            for style in soup.find_all('style'):
+                css_content = style.string
+                if css_content:
+                    image_urls = _URL_IN_CSS.findall(css_content)
+                    for img_url in image_urls:
+                        full_url = urljoin(url, img_url)
+                        if self.is_same_domain(full_url):
+                            self.enqueue_url(full_url)
+    
+            # Process inline style attributes; they can sit on any tag, so scan the raw
+            # page's start tags with script bodies and comments blanked out
+            markup = _NON_MARKUP_RE.sub(b'', html_content)
+            for match in _STYLE_ATTR_RE.finditer(markup):
+                value = match.group(1) or match.group(2) or match.group(3) or b''
+                style_content = html.unescape(value.decode('utf-8', errors='replace'))
+                image_urls = _URL_IN_CSS.findall(style_content)
                 for img_url in image_urls:
                     full_url = urljoin(url, img_url)
                     if self.is_same_domain(full_url):
-                        self.scrape_url(full_url)
-    
-        # Process inline style attributes
-        for tag in soup.find_all(style=True):
-            style_content = tag['style']
-            image_urls = re.findall(r'url\([\'"]?([^\'"]+)[\'"]?\)', style_content)
-            for img_url in image_urls:
-                full_url = urljoin(url, img_url)
-                if self.is_same_domain(full_url):
-                    self.scrape_url(full_url)
-    
-        # Update the HTML content with the modified iframe src
-        updated_html = str(soup)
-        self.save_file(url, updated_html, '.html')
+                        self.enqueue_url(full_url)
+    
+            # Iframes are rare, so only pages that have one get the full parse needed to rewrite their src
+            if iframes:
+                full_soup = BeautifulSoup(html_content, 'lxml')
+                for iframe in full_soup.find_all('iframe'):
+                    iframe_src = iframe.get('src')
+                    if iframe_src:
+                        iframe_url = urljoin(url, iframe_src)
+                        if self.is_same_domain(iframe_url):
+                            # Update iframe src to use the target URL
+                            new_src = self.update_url(iframe_url)
+                            if new_src != iframe_src:
+                                iframe['src'] = new_src
+                                mutated = True
+        finally:
+            # Always save the page, even if discovery or an iframe scrape fails;
+            # re-serialize only when an iframe src actually changed
+            if mutated:
+                self.save_file(url, full_soup.encode('utf-8'), '.html', is_binary=True)
+            else:
+                self.save_file(url, html_content, '.html', is_binary=True)
 
     def is_same_domain(self, url):
-        return urlparse(url).netloc == urlparse(self.source_url).netloc
+        return urlparse(url).netloc == self._source_netloc
 
-    def save_file(self, url, content, extension, is_binary=False):
+    def _target_path(self, url):
         parsed_url = urlparse(url)
         relative_path = parsed_url.path.lstrip('/')
         if not relative_path:
@@ -354,6 +436,28 @@ class ImprovedGhostStaticGenerator:
         
         file_path = os.path.join(self.public_dir, relative_path)
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        return file_path
+
+    async def _write_stream(self, file_path, response):
+        # Stream into a temp file of our own so a failed download never replaces the
+        # previous good copy and concurrent downloads of the same target don't interleave
+        part_path = f"{file_path}.{next(self._part_ids)}.part"
+        try:
+            with open(part_path, 'wb') as f:
+                async for chunk in response.content.iter_chunked(_STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+            os.replace(part_path, file_path)
+        except BaseException:
+            try:
+                os.remove(part_path)
+            except FileNotFoundError:
+                pass
+            raise
+        
+        logging.info(f"Saved: {file_path}")
+
+    def save_file(self, url, content, extension, is_binary=False):
+        file_path = self._target_path(url)
         
         mode = 'wb' if is_binary else 'w'
         encoding = None if is_binary else 'utf-8'
@@ -362,32 +466,69 @@ class ImprovedGhostStaticGenerator:
         
         logging.info(f"Saved: {file_path}")
 
-    def convert_images(self):
-        def convert_to_webp(img_path):
+    def collect_public_files(self):
+        # Walk the public directory once and sort files by how they are post-processed
+        image_files = []
+        html_files = []
+        other_text_files = []
+        for root, _, files in os.walk(self.public_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                file_extension = os.path.splitext(file)[1].lower()
+                if file_extension == '.part':
+                    # Left behind by an interrupted download; never commit it
+                    os.remove(file_path)
+                    logging.info(f"Removed partial download: {file_path}")
+                elif file_extension in ['.jpg', '.jpeg', '.png', '.gif']:
+                    image_files.append(file_path)
+                elif file_extension == '.html':
+                    html_files.append(file_path)
+                elif file_extension in ['.xml', '.css', '.js', '.json']:
+                    other_text_files.append(file_path)
+        return image_files, html_files, other_text_files
+
+    def post_process_public_dir(self):
+        image_files, html_files, other_text_files = self.collect_public_files()
+        self.convert_images(image_files)  # Will only convert images that haven't been converted already
+        for file_path in html_files:
+            self.update_html_file(file_path)
+        for file_path in other_text_files:
+            self.update_urls_in_file(file_path)
+
+    def convert_images(self, image_files):
+        def convert_to_webp(img, img_path):
             output_path = f"{os.path.splitext(img_path)[0]}.webp"
-            if os.path.exists(output_path) and not self.force_reconvert:
-                logging.info(f"WebP already exists, skipping: {img_path}")
-                return True
-            try:
-                subprocess.run(['cwebp', '-q', '80', img_path, '-o', output_path], check=True)
-                logging.info(f"Converted to WebP: {img_path}")
-                return True
-            except subprocess.CalledProcessError as e:
-                logging.error(f"Error converting {img_path} to WebP: {str(e)}")
-                return False
+            img.save(output_path, 'WEBP', quality=80)
+            logging.info(f"Converted to WebP: {img_path}")
 
-        def convert_to_avif(img_path):
+        def convert_to_avif(img, img_path):
             output_path = f"{os.path.splitext(img_path)[0]}.avif"
-            if os.path.exists(output_path) and not self.force_reconvert:
-                logging.info(f"AVIF already exists, skipping: {img_path}")
+            img.save(output_path, 'AVIF', quality=80)
+            logging.info(f"Converted to AVIF: {img_path}")
+
+        def convert_with_pillow(img_path):
+            # Decode once and encode WebP and AVIF from the same in-memory image
+            conversions = []
+            for ext, label, convert in (('webp', 'WebP', convert_to_webp), ('avif', 'AVIF', convert_to_avif)):
+                if os.path.exists(f"{os.path.splitext(img_path)[0]}.{ext}") and not self.force_reconvert:
+                    logging.info(f"{label} already exists, skipping: {img_path}")
+                else:
+                    conversions.append((label, convert))
+            if not conversions:
                 return True
             try:
-                # Use 4 threads for AVIF conversion
-                subprocess.run(['avifenc', '-s', '0', '-j', '4', '-d', '8', img_path, output_path], check=True)
-                logging.info(f"Converted to AVIF: {img_path}")
-                return True
-            except subprocess.CalledProcessError as e:
-                logging.error(f"Error converting {img_path} to AVIF: {str(e)}")
+                with Image.open(img_path) as img:
+                    img.load()
+                    success = True
+                    for label, convert in conversions:
+                        try:
+                            convert(img, img_path)
+                        except (OSError, ValueError) as e:
+                            logging.error(f"Error converting {img_path} to {label}: {str(e)}")
+                            success = False
+                    return success
+            except OSError as e:
+                logging.error(f"Error opening {img_path} for conversion: {str(e)}")
                 return False
 
         def convert_to_jxl(img_path):
@@ -406,141 +547,144 @@ class ImprovedGhostStaticGenerator:
                 logging.error("cjxl command not found. Please ensure JPEG XL tools are installed.")
                 return False
 
-        def process_image(img_path):
-            webp_success = convert_to_webp(img_path)
-            avif_success = convert_to_avif(img_path)
-            jxl_success = convert_to_jxl(img_path)
-            return webp_success, avif_success, jxl_success
-
-        image_paths = []
-        for root, _, files in os.walk(self.public_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                if file.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')) and (self.force_reconvert or not all(os.path.exists(f"{os.path.splitext(file_path)[0]}.{ext}") for ext in ['webp', 'avif', 'jxl'])):
-                    image_paths.append(file_path)
+        image_paths = [file_path for file_path in image_files
+                       if self.force_reconvert or not all(os.path.exists(f"{os.path.splitext(file_path)[0]}.{ext}") for ext in ['webp', 'avif', 'jxl'])]
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
-            futures = [executor.submit(process_image, img_path) for img_path in image_paths]
+        # Pillow encodes and cjxl runs as separate tasks; workers mostly sit blocked
+        # in native encoders or subprocess.run
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2 * (os.cpu_count() or 1)) as executor:
+            futures = [executor.submit(convert, img_path)
+                       for img_path in image_paths
+                       for convert in (convert_with_pillow, convert_to_jxl)]
             for future in concurrent.futures.as_completed(futures):
                 future.result()
 
-    def update_html_for_image_formats(self):
-        for root, _, files in os.walk(self.public_dir):
-            for file in files:
-                if file.endswith('.html'):
-                    file_path = os.path.join(root, file)
-                    logging.info(f"Processing HTML file: {file_path}")
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    soup = BeautifulSoup(content, 'html.parser')
-                    images_processed = 0
-    
-                    # Update Open Graph meta tags
-                    og_image = soup.find('meta', property='og:image')
-                    if og_image:
-                        og_image['content'] = self.update_url(og_image['content'])
-                        logging.info(f"Updated og:image: {og_image['content']}")
-    
-                    for img in soup.find_all('img'):
-                        src = img.get('src') or img.get('data-src')
-                        if not src:
-                            logging.warning(f"Image without src found in {file_path}")
-                            continue
-    
-                        logging.info(f"Processing image with src: {src}")
-    
-                        original_srcset = img.get('srcset') or img.get('data-srcset', '')
-                        sizes = img.get('sizes', '')
-    
-                        # Update src and srcset to use target URL
-                        img['src'] = self.update_url(src)
-                        if original_srcset:
-                            img['srcset'] = ', '.join([f"{self.update_url(s.split()[0])} {s.split()[1]}" if len(s.split()) > 1 else self.update_url(s) for s in original_srcset.split(',')])
-    
-                        # Create picture tag
-                        picture = soup.new_tag('picture')
-                        img.wrap(picture)
-    
-                        formats = [('webp', 'image/webp'), ('avif', 'image/avif'), ('jxl', 'image/jxl')]
-    
-                        for format_ext, format_type in formats:
-                            srcset = []
-                            for src_entry in original_srcset.split(','):
-                                src_entry = src_entry.strip()
-                                if src_entry:
-                                    parts = src_entry.split()
-                                    if len(parts) == 2:
-                                        orig_src, width = parts
-                                        new_src = re.sub(r'\.[^.]+$', f'.{format_ext}', orig_src)
-                                        local_path = self.url_to_local_path(new_src)
-                                        if local_path and os.path.exists(local_path):
-                                            srcset.append(f"{self.update_url(new_src)} {width}")
-                            
-                            if srcset:
-                                source = soup.new_tag('source', type=format_type)
-                                source['srcset'] = ', '.join(srcset)
-                                if sizes:
-                                    source['sizes'] = sizes
-                                picture.insert(0, source)
-                                logging.info(f"Created source for {format_type}")
-    
-                        # Ensure all original attributes of the img tag are preserved
-                        for attr, value in img.attrs.items():
-                            if attr not in ['src', 'srcset', 'sizes', 'data-src', 'data-srcset']:
-                                img[attr] = value
-    
-                        # Ensure lazy loading
-                        img['loading'] = 'lazy'
-                        
-                        images_processed += 1
-                    
-                    logging.info(f"Processed {images_processed} images in {file_path}")
-                    
-                    # Update all URLs in the HTML content
-                    content = self.update_all_urls(str(soup))
-                    
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                    logging.info(f"Updated {file_path}")
-    
+    def update_html_file(self, file_path):
+        logging.info(f"Processing HTML file: {file_path}")
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+
+        # Without <img> tags there is no picture rewrite, and the og:image and
+        # iframe src updates are covered by the plain URL replacement
+        if b'<img' not in raw:
+            self.write_updated_urls(file_path, raw)
+            return
+
+        # Parse once and apply every HTML rewrite before a single write; the
+        # tree is mutated directly in lxml rather than through BeautifulSoup
+        # Pages are always saved as UTF-8; don't let libxml2 guess when there's no charset meta
+        tree = lxml_html.document_fromstring(raw, parser=lxml_html.HTMLParser(encoding='utf-8'))
+        self.update_html_for_image_formats(tree, file_path)
+
+        # Update iframe src URLs
+        for iframe in tree.iter('iframe'):
+            src = iframe.get('src')
+            if src:
+                iframe.set('src', self.update_url(src))
+
+        # Update all URLs in the HTML content
+        # libxml2 implies a default doctype, so only keep one the page actually declared
+        doctype = tree.getroottree().docinfo.doctype if raw.lstrip()[:9].lower() == b'<!doctype' else None
+        updated_content = lxml_html.tostring(tree, encoding='utf-8', doctype=doctype)
+        # libxml2 doesn't know <source> is void and closes it; HTML parsers ignore the
+        # end tag anyway, so dropping it restores valid markup
+        updated_content = updated_content.replace(b'</source>', b'')
+        updated_content = updated_content.replace(self.source_url.encode('utf-8'), self.target_url.encode('utf-8'))
+
+        if updated_content != raw:
+            with open(file_path, 'wb') as f:
+                f.write(updated_content)
+            logging.info(f"Updated {file_path}")
+
+    def update_html_for_image_formats(self, tree, file_path):
+        images_processed = 0
+    
+        # Update Open Graph meta tags
+        og_image = tree.find('.//meta[@property="og:image"]')
+        if og_image is not None and og_image.get('content'):
+            og_image.set('content', self.update_url(og_image.get('content')))
+            logging.info(f"Updated og:image: {og_image.get('content')}")
+    
+        # Snapshot the images first, since wrapping them reshapes the tree
+        for img in list(tree.iter('img')):
+            src = img.get('src') or img.get('data-src')
+            if not src:
+                logging.warning(f"Image without src found in {file_path}")
+                continue
+    
+            logging.info(f"Processing image with src: {src}")
+    
+            original_srcset = img.get('srcset') or img.get('data-srcset', '')
+            sizes = img.get('sizes', '')
+    
+            # Update src and srcset to use target URL
+            img.set('src', self.update_url(src))
+            if original_srcset:
+                img.set('srcset', _SRCSET_URL_RE.sub(lambda m: self.update_url(m.group(1)) + (m.group(2) or ''), original_srcset))
+
+            # Parse the srcset once and reuse the candidates for every format
+            srcset_entries = [(entry_url, descriptor.strip()) for entry_url, descriptor in _SRCSET_URL_RE.findall(original_srcset) if descriptor]
+    
+            # Create picture tag; text that followed the img stays after the picture
+            picture = etree.Element('picture')
+            img.addprevious(picture)
+            picture.tail, img.tail = img.tail, None
+            picture.append(img)
+    
+            formats = [('webp', 'image/webp'), ('avif', 'image/avif'), ('jxl', 'image/jxl')]
+    
+            for format_ext, format_type in formats:
+                srcset = []
+                for orig_src, width in srcset_entries:
+                    new_src = _EXT_RE.sub(f'.{format_ext}', orig_src)
+                    local_path = self.url_to_local_path(new_src)
+                    if local_path and self._exists(local_path):
+                        srcset.append(f"{self.update_url(new_src)} {width}")
+                
+                if srcset:
+                    source = etree.Element('source', type=format_type, srcset=', '.join(srcset))
+                    if sizes:
+                        source.set('sizes', sizes)
+                    picture.insert(0, source)
+                    logging.info(f"Created source for {format_type}")
+    
+            # Ensure lazy loading; every other img attribute is left untouched
+            img.set('loading', 'lazy')
+            
+            images_processed += 1
+        
+        logging.info(f"Processed {images_processed} images in {file_path}")
+    
+    def _exists(self, path):
+        exists = self._exists_cache.get(path)
+        if exists is None:
+            exists = os.path.exists(path)
+            self._exists_cache[path] = exists
+        return exists
+
     def update_url(self, url):
         return url.replace(self.source_url, self.target_url)
     
-    def update_all_urls(self, content):
-        return content.replace(self.source_url, self.target_url)
+    def update_urls_in_file(self, file_path):
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        self.write_updated_urls(file_path, raw)
 
-    def update_urls_in_all_files(self):
-        for root, _, files in os.walk(self.public_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                _, file_extension = os.path.splitext(file)
-                
-                if file_extension.lower() in ['.html', '.xml', '.css', '.js', '.json']:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    updated_content = self.update_all_urls(content)
-                    
-                    # Update iframe src URLs
-                    if file_extension.lower() == '.html':
-                        soup = BeautifulSoup(updated_content, 'html.parser')
-                        for iframe in soup.find_all('iframe'):
-                            src = iframe.get('src')
-                            if src:
-                                iframe['src'] = self.update_url(src)
-                        updated_content = str(soup)
-                    
-                    if updated_content != content:
-                        with open(file_path, 'w', encoding='utf-8') as f:
-                            f.write(updated_content)
-                        logging.info(f"Updated URLs in {file_path}")
+    def write_updated_urls(self, file_path, raw):
+        # Most assets never mention the source URL; skip them without decoding
+        source_url_bytes = self.source_url.encode('utf-8')
+        if source_url_bytes not in raw:
+            return
+
+        with open(file_path, 'wb') as f:
+            f.write(raw.replace(source_url_bytes, self.target_url.encode('utf-8')))
+        logging.info(f"Updated URLs in {file_path}")
 
     def url_to_local_path(self, url):
         if url.startswith('/'):
             return os.path.join(self.public_dir, url.lstrip('/'))
         parsed_url = urllib.parse.urlparse(url)
-        if parsed_url.netloc and parsed_url.netloc not in [urllib.parse.urlparse(self.source_url).netloc, urllib.parse.urlparse(self.target_url).netloc]:
+        if parsed_url.netloc and parsed_url.netloc not in [self._source_netloc, self._target_netloc]:
             return None
         relative_path = parsed_url.path.lstrip('/')
         return os.path.join(self.public_dir, relative_path)
@@ -556,20 +700,6 @@ class ImprovedGhostStaticGenerator:
             relative_path = os.path.relpath(local_path, os.path.dirname(current_file_path))
             return relative_path.replace('\\', '/')
 
-    def replace_urls_in_files(self):
-        for root, _, files in os.walk(self.public_dir):
-            for file in files:
-                if file.endswith(('.html', '.css', '.js')):
-                    file_path = os.path.join(root, file)
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    content = content.replace(self.source_url, self.target_url)
-                    content = content.replace("helium", "cadenkraft.com")
-                    
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-
     def commit_and_push(self):
         try:
             repo = git.Repo(self.repo_path)
@@ -585,11 +715,9 @@ class ImprovedGhostStaticGenerator:
     def run(self):
         logging.info("Starting the static site generation process")
         self.update_repo()
-        self.scrape_site()
+        asyncio.run(self.scrape_site())
         self.copy_renders_folder()  # Now uses smart copy
-        self.convert_images()       # Will only convert images that haven't been converted already
-        self.update_html_for_image_formats()
-        self.update_urls_in_all_files()
+        self.post_process_public_dir()
         self.commit_and_push()
         logging.info("Static site generation process completed")
 